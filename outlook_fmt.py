@@ -0,0 +1,69 @@
+"""
+Pure formatting and parsing helpers for the Outlook MCP server.
+
+Kept free of I/O and third-party imports so the module can be compiled with
+mypyc (mypyc outlook_fmt.py). When the compiled extension sits next to this
+file Python imports it in preference to the source; otherwise the pure-Python
+module is used.
+"""
+
+import re
+
+_RECIPIENT_SEPARATOR = re.compile(r"[,;]\s*")
+
+# Shared payload for messages sent without body text
+_EMPTY_TEXT_BODY = {"contentType": "text", "content": ""}
+
+
+def join_addresses(recipients: list) -> str:
+    """Join recipient email addresses into a comma-separated string."""
+    return ", ".join([r.get('emailAddress', {}).get('address', '') for r in recipients])
+
+
+def format_email(msg: dict) -> str:
+    """Format email message for display."""
+    get = msg.get
+    sender = get('from', {}).get('emailAddress', {})
+    cc_recipients = get('ccRecipients', [])
+    body_preview = get('bodyPreview', '')
+    msg_id = get('id', '')
+
+    return (
+        f"📧 Subject: {get('subject', 'No Subject')}\n"
+        f"👤 From: {sender.get('name', 'N/A')} <{sender.get('address', 'N/A')}>\n"
+        f"📤 To: {join_addresses(get('toRecipients', [])) or 'N/A'}"
+        + (f"\n📧 CC: {join_addresses(cc_recipients)}" if cc_recipients else "")
+        + f"\n📅 Received: {get('receivedDateTime', 'N/A')}\n"
+        f"📤 Sent: {get('sentDateTime', 'N/A')}\n"
+        f"⭐ Importance: {get('importance', 'normal')}\n"
+        f"📎 Has Attachments: {get('hasAttachments', False)}\n"
+        f"📝 Is Draft: {get('isDraft', False)}\n"
+        f"📖 Is Read: {get('isRead', False)}"
+        + (f"\n\n📄 Preview:\n{body_preview[:500]}" if body_preview else "")
+        + (f"\n\n🔑 ID: {msg_id}" if msg_id else "")
+    )
+
+
+def format_pagination(result: dict) -> str:
+    """Format the next-page hint for a paged listing, or an empty string."""
+    next_link = result.get("@odata.nextLink")
+    if not next_link:
+        return ""
+    return f"\n\n⚠️ More results available. Use skip or max_pages to paginate.\n🔗 Next page: {next_link}"
+
+
+def parse_recipients(recipients: str) -> list[dict] | None:
+    """Parse a comma/semicolon-separated address string into Graph recipients."""
+    parsed = [
+        {"emailAddress": {"address": addr.strip()}}
+        for addr in _RECIPIENT_SEPARATOR.split(recipients) if addr.strip()
+    ]
+    return parsed or None
+
+
+def message_body(body: str, body_type: str) -> dict:
+    """Build a Graph message body, reusing the shared empty text body when possible."""
+    content_type = body_type.lower()
+    if not body and content_type == "text":
+        return _EMPTY_TEXT_BODY
+    return {"contentType": content_type, "content": body}
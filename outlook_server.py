@@ -6,12 +6,19 @@ Outlook Mail MCP Server - Provides email management via Microsoft Graph API
 
 import os
 import sys
+import asyncio
 import logging
-import json
-from datetime import datetime
+import base64
+import time
+import functools
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from urllib.parse import urlencode
 import httpx
+import orjson
 from dateutil import parser as date_parser
 from mcp.server.fastmcp import FastMCP
+from outlook_fmt import format_email, format_pagination, join_addresses, parse_recipients, message_body
 
 # Configure logging to stderr
 logging.basicConfig(
@@ -21,8 +28,9 @@ logging.basicConfig(
 )
 logger = logging.getLogger("outlook-server")
 
-# Initialize MCP server
-mcp = FastMCP("outlook")
+# httpx logs every request URL at INFO, including pre-authenticated upload URLs
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
 
 # Configuration from environment
 TENANT_ID = os.environ.get("TENANT_ID", "")
@@ -36,14 +44,90 @@ GRAPH_BASE_URL = f"https://graph.microsoft.com/{GRAPH_API_VERSION}"
 # Token cache
 _access_token = None
 _token_expiry = None
+_token_lock = asyncio.Lock()
+_refresh_task: asyncio.Task | None = None
 
+# Request headers built for the current token: (token, headers, headers with Prefer text body)
+_cached_headers: tuple[str, dict, dict] | None = None
 
-async def get_access_token() -> str:
-    """Get OAuth2 access token using client credentials flow."""
-    global _access_token, _token_expiry
+# Refresh the token this many seconds before it expires
+TOKEN_REFRESH_MARGIN = 300
+
+# Fields rendered by format_email; listing tools select only these
+DEFAULT_LIST_SELECT = "id,subject,from,toRecipients,ccRecipients,receivedDateTime,sentDateTime,importance,hasAttachments,isDraft,isRead,bodyPreview"
+
+# Ask Graph to return message bodies as plain text instead of HTML
+PREFER_TEXT_BODY = 'outlook.body-content-type="text"'
+
+# read_emails probes the result size when top exceeds MAX_LIST_TOP, and clamps
+# top to MAX_LIST_TOP when more than LARGE_RESULT_THRESHOLD messages match
+MAX_LIST_TOP = 100
+LARGE_RESULT_THRESHOLD = 500
+
+# ETag cache for cacheable GETs: (method, endpoint, params) -> (etag, body, stored_at)
+ETAG_CACHE_TTL = 300
+ETAG_CACHE_SIZE = 64
+_etag_cache: OrderedDict = OrderedDict()
+
+# Maximum sub-requests Graph accepts in a single JSON batch, and how many
+# times throttled (429) sub-requests are re-batched
+GRAPH_BATCH_LIMIT = 20
+GRAPH_BATCH_RETRIES = 2
+
+# Paged listings: most pages fetched per call, and how many run at once in
+# concurrent mode (Graph allows 4 concurrent requests per mailbox)
+MAX_PAGES = 5
+PAGE_CONCURRENCY = 4
+
+# Longest Retry-After we honour before giving up on a throttled request
+MAX_RETRY_AFTER = 30
+
+# Files larger than this are uploaded through an upload session
+ATTACHMENT_UPLOAD_THRESHOLD = 3 * 1024 * 1024
+# Upload session chunk size (Graph requires a multiple of 320 KiB)
+UPLOAD_CHUNK_SIZE = 327680
+
+# Shared HTTP client (created lazily, closed on server shutdown)
+_client: httpx.AsyncClient | None = None
+
+
+def _get_client() -> httpx.AsyncClient:
+    """Return the shared HTTP/2 client, creating it on first use."""
+    global _client
     
-    if _access_token and _token_expiry and datetime.now().timestamp() < _token_expiry:
-        return _access_token
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=60),
+            timeout=30
+        )
+    
+    return _client
+
+
+@asynccontextmanager
+async def lifespan(server: FastMCP):
+    """Stop background token refresh and close the shared HTTP client on shutdown."""
+    global _client, _refresh_task
+    
+    try:
+        yield
+    finally:
+        if _refresh_task is not None:
+            _refresh_task.cancel()
+            _refresh_task = None
+        if _client is not None:
+            await _client.aclose()
+            _client = None
+
+
+# Initialize MCP server
+mcp = FastMCP("outlook", lifespan=lifespan)
+
+
+async def _fetch_token() -> int:
+    """Fetch a new OAuth2 access token and update the cache. Returns expires_in seconds."""
+    global _access_token, _token_expiry
     
     if not TENANT_ID or not CLIENT_ID or not CLIENT_SECRET:
         raise Exception("Missing required credentials: TENANT_ID, CLIENT_ID, CLIENT_SECRET")
@@ -57,89 +141,354 @@ async def get_access_token() -> str:
         "grant_type": "client_credentials"
     }
     
-    async with httpx.AsyncClient() as client:
-        response = await client.post(token_url, data=data, timeout=30)
-        response.raise_for_status()
-        token_data = response.json()
+    client = _get_client()
+    response = await client.post(token_url, data=data, timeout=30)
+    response.raise_for_status()
+    token_data = response.json()
+    
+    _access_token = token_data["access_token"]
+    expires_in = token_data.get("expires_in", 3600)
+    _token_expiry = time.monotonic() + expires_in - 60
+    
+    return expires_in
+
+
+async def _refresh_loop(expires_in: int):
+    """Refresh the access token in the background shortly before it expires."""
+    while True:
+        await asyncio.sleep(max(expires_in - TOKEN_REFRESH_MARGIN, 60))
+        try:
+            async with _token_lock:
+                expires_in = await _fetch_token()
+        except Exception as e:
+            # Inline refresh in get_access_token remains the fallback
+            logger.warning(f"Background token refresh failed: {e}")
+            expires_in = TOKEN_REFRESH_MARGIN + 60
+
+
+async def get_access_token() -> str:
+    """Get OAuth2 access token using client credentials flow."""
+    global _refresh_task
+    
+    if _access_token and _token_expiry and time.monotonic() < _token_expiry:
+        return _access_token
+    
+    async with _token_lock:
+        # Another caller may have refreshed while we waited for the lock
+        if _access_token and _token_expiry and time.monotonic() < _token_expiry:
+            return _access_token
         
-        _access_token = token_data["access_token"]
-        expires_in = token_data.get("expires_in", 3600)
-        _token_expiry = datetime.now().timestamp() + expires_in - 60
+        expires_in = await _fetch_token()
+        
+        if _refresh_task is None or _refresh_task.done():
+            _refresh_task = asyncio.create_task(_refresh_loop(expires_in))
         
         return _access_token
 
 
-async def make_graph_request(method: str, endpoint: str, data: dict = None, params: dict = None) -> dict:
-    """Make authenticated request to Microsoft Graph API."""
+class GraphAPIError(Exception):
+    """Error response from Microsoft Graph, keeping the status and Retry-After hint."""
+    
+    def __init__(self, status_code: int, body: str, retry_after: str = None):
+        super().__init__(f"Graph API error {status_code}: {body}")
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+def _retry_delay(retry_after) -> float:
+    """Seconds to wait for a Retry-After value, capped at MAX_RETRY_AFTER."""
+    try:
+        return min(max(float(retry_after), 0), MAX_RETRY_AFTER)
+    except (TypeError, ValueError):
+        return 1.0
+
+
+def _invalidate_token(token: str):
+    """Drop the cached access token if it is still the given (rejected) token."""
+    global _access_token, _token_expiry, _cached_headers
+    
+    if _access_token == token:
+        _access_token = None
+        _token_expiry = None
+    _cached_headers = None
+
+
+def _auth_headers(token: str, prefer_text: bool) -> dict:
+    """Return the shared request headers for token, rebuilding them only when the token changes."""
+    global _cached_headers
+    
+    if _cached_headers is None or _cached_headers[0] != token:
+        headers = {
+            "Authorization": f"Bearer {token}",
+            "Content-Type": "application/json"
+        }
+        _cached_headers = (token, headers, {**headers, "Prefer": PREFER_TEXT_BODY})
+    
+    return _cached_headers[2] if prefer_text else _cached_headers[1]
+
+
+async def make_graph_request(method: str, endpoint: str, data: dict = None, params: dict = None, extra_headers: dict = None, retried: bool = False, cacheable: bool = False) -> dict:
+    """Make authenticated request to Microsoft Graph API.
+    
+    A 401 response (e.g. a token revoked server-side) is retried once with a freshly fetched token.
+    With cacheable=True, GET responses carrying an ETag are kept for up to ETAG_CACHE_TTL
+    seconds and revalidated with If-None-Match; a 304 returns the cached body.
+    """
+    method = method.upper()
+    if method not in ("GET", "POST", "PATCH", "DELETE"):
+        raise ValueError(f"Unsupported method: {method}")
+    
     token = await get_access_token()
-    url = f"{GRAPH_BASE_URL}{endpoint}"
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Content-Type": "application/json"
-    }
+    url = GRAPH_BASE_URL + endpoint
     
-    async with httpx.AsyncClient() as client:
-        try:
-            if method.upper() == "GET":
-                response = await client.get(url, headers=headers, params=params, timeout=30)
-            elif method.upper() == "POST":
-                response = await client.post(url, headers=headers, json=data, params=params, timeout=30)
-            elif method.upper() == "PATCH":
-                response = await client.patch(url, headers=headers, json=data, params=params, timeout=30)
-            elif method.upper() == "DELETE":
-                response = await client.delete(url, headers=headers, timeout=30)
-            else:
-                raise ValueError(f"Unsupported method: {method}")
-            
-            response.raise_for_status()
-            
-            if response.text:
-                return response.json()
-            return {}
-        except httpx.HTTPStatusError as e:
-            error_body = e.response.text
-            raise Exception(f"Graph API error {e.response.status_code}: {error_body}")
+    # Cached header dicts are shared across calls; copy before adding anything
+    headers = _auth_headers(token, method == "GET" and "/messages" in endpoint)
+    if extra_headers:
+        headers = {**headers, **extra_headers}
+    
+    cache_key = None
+    cached = None
+    if cacheable and method == "GET":
+        cache_key = (method, endpoint, tuple(sorted((params or {}).items())))
+        cached = _etag_cache.get(cache_key)
+        if cached and time.monotonic() - cached[2] > ETAG_CACHE_TTL:
+            del _etag_cache[cache_key]
+            cached = None
+        if cached:
+            headers = {**headers, "If-None-Match": cached[0]}
+    
+    client = _get_client()
+    try:
+        response = await client.request(
+            method,
+            url,
+            headers=headers,
+            json=data if method in ("POST", "PATCH") else None,
+            params=params,
+            timeout=30
+        )
+        
+        if cached and response.status_code == 304:
+            # A concurrent call may have evicted the entry while we awaited the response
+            if cache_key in _etag_cache:
+                _etag_cache.move_to_end(cache_key)
+            return cached[1]
+        
+        response.raise_for_status()
+        
+        result = orjson.loads(response.content) if response.content else {}
+        
+        etag = response.headers.get("ETag")
+        if cache_key and etag:
+            _etag_cache[cache_key] = (etag, result, time.monotonic())
+            _etag_cache.move_to_end(cache_key)
+            while len(_etag_cache) > ETAG_CACHE_SIZE:
+                _etag_cache.popitem(last=False)
+        
+        return result
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code == 401 and not retried:
+            logger.warning("Graph API returned 401, retrying with a new access token")
+            _invalidate_token(token)
+            return await make_graph_request(method, endpoint, data, params, extra_headers, retried=True, cacheable=cacheable)
+        
+        error_body = e.response.text
+        raise GraphAPIError(e.response.status_code, error_body, e.response.headers.get("Retry-After"))
 
 
-def format_email(msg: dict) -> str:
-    """Format email message for display."""
-    fields = []
+async def graph_batch(subreqs: list[dict]) -> list[dict]:
+    """Send sub-requests through the Graph JSON /$batch endpoint.
+    
+    Each sub-request is a dict with "method", "url" (relative to the API version,
+    query string included) and an optional "body". Requests are packed
+    GRAPH_BATCH_LIMIT at a time and the batches are sent one after another,
+    since Graph throttles sub-requests against the per-mailbox concurrency
+    limit. Sub-requests throttled with 429 are re-batched after their
+    Retry-After, up to GRAPH_BATCH_RETRIES times. Responses are returned in
+    the same order as subreqs, each with "status", "headers" and "body".
+    """
+    async def send_chunk(indexes: list[int]) -> list[dict]:
+        batch = {"requests": []}
+        for i in indexes:
+            req = subreqs[i]
+            item = {"id": str(i), "method": req["method"].upper(), "url": req["url"]}
+            if req.get("body") is not None:
+                item["body"] = req["body"]
+                item["headers"] = {"Content-Type": "application/json"}
+            elif item["method"] == "GET" and "/messages" in item["url"]:
+                item["headers"] = {"Prefer": PREFER_TEXT_BODY}
+            batch["requests"].append(item)
+        
+        result = await make_graph_request("POST", "/$batch", data=batch)
+        return result.get("responses", [])
+    
+    results = [{"status": 0, "body": {}}] * len(subreqs)
+    pending = list(range(len(subreqs)))
+    
+    for attempt in range(GRAPH_BATCH_RETRIES + 1):
+        throttled = []
+        delay = 0.0
+        
+        for start in range(0, len(pending), GRAPH_BATCH_LIMIT):
+            indexes = pending[start:start + GRAPH_BATCH_LIMIT]
+            by_id = {resp.get("id"): resp for resp in await send_chunk(indexes)}
+            
+            for i in indexes:
+                resp = by_id.get(str(i), {"status": 0, "body": {}})
+                if resp.get("status") == 429 and attempt < GRAPH_BATCH_RETRIES:
+                    retry_after = next(
+                        (v for k, v in resp.get("headers", {}).items() if k.lower() == "retry-after"),
+                        None
+                    )
+                    delay = max(delay, _retry_delay(retry_after))
+                    throttled.append(i)
+                else:
+                    results[i] = resp
+        
+        if not throttled:
+            break
+        
+        await asyncio.sleep(delay)
+        pending = throttled
     
-    fields.append(f"📧 Subject: {msg.get('subject', 'No Subject')}")
+    return results
+
+
+async def _get_page(endpoint: str, params: dict = None, cacheable: bool = False) -> dict:
+    """GET one page, retrying once after Retry-After if Graph throttles it (429)."""
+    try:
+        return await make_graph_request("GET", endpoint, params=params, cacheable=cacheable)
+    except GraphAPIError as e:
+        if e.status_code != 429:
+            raise
+        await asyncio.sleep(_retry_delay(e.retry_after))
+        return await make_graph_request("GET", endpoint, params=params, cacheable=cacheable)
+
+
+async def get_paged(endpoint: str, params: dict = None, max_pages: str = "1", concurrent: str = "false", cacheable: bool = False) -> dict:
+    """GET a Graph collection, following up to max_pages pages (at most MAX_PAGES).
     
-    sender = msg.get('from', {})
-    sender_email = sender.get('emailAddress', {}).get('address', 'N/A')
-    sender_name = sender.get('emailAddress', {}).get('name', 'N/A')
-    fields.append(f"👤 From: {sender_name} <{sender_email}>")
+    Pages are followed sequentially via @odata.nextLink by default. With
+    concurrent="true" the remaining pages are requested in parallel using
+    $skip/$top offsets (sized from @odata.count), at most PAGE_CONCURRENCY at
+    a time. A page that still fails after one throttling retry ends the
+    listing early. Returns a dict with the combined "value" list and the
+    "@odata.nextLink" of the last page fetched, if any.
+    """
+    params = dict(params or {})
+    pages = min(max(int(max_pages or 1), 1), MAX_PAGES)
+    use_skip = pages > 1 and concurrent.lower() == "true" and "$search" not in params
     
-    to_recipients = msg.get('toRecipients', [])
-    to_list = ", ".join([r.get('emailAddress', {}).get('address', '') for r in to_recipients])
-    fields.append(f"📤 To: {to_list or 'N/A'}")
+    if use_skip:
+        params["$count"] = "true"
     
-    cc_recipients = msg.get('ccRecipients', [])
-    if cc_recipients:
-        cc_list = ", ".join([r.get('emailAddress', {}).get('address', '') for r in cc_recipients])
-        fields.append(f"📧 CC: {cc_list}")
+    result = await _get_page(endpoint, params, cacheable)
+    items = list(result.get("value", []))
+    next_link = result.get("@odata.nextLink")
     
-    fields.append(f"📅 Received: {msg.get('receivedDateTime', 'N/A')}")
-    fields.append(f"📤 Sent: {msg.get('sentDateTime', 'N/A')}")
+    if pages <= 1 or not next_link:
+        return {"value": items, "@odata.nextLink": next_link}
     
-    importance = msg.get('importance', 'normal')
-    fields.append(f"⭐ Importance: {importance}")
+    if use_skip:
+        top = int(params.get("$top") or len(items) or 1)
+        skip = int(params.get("$skip") or 0)
+        
+        count = result.get("@odata.count")
+        if count is not None:
+            pages = min(pages, -(-(int(count) - skip) // top))
+        
+        semaphore = asyncio.Semaphore(PAGE_CONCURRENCY)
+        
+        async def fetch(page_skip: int) -> dict:
+            async with semaphore:
+                return await _get_page(endpoint, {**params, "$skip": str(page_skip)}, cacheable)
+        
+        tasks = [fetch(skip + i * top) for i in range(1, pages)]
+        for page in await asyncio.gather(*tasks, return_exceptions=True):
+            # gather can also hand back CancelledError, which is not an Exception
+            if isinstance(page, BaseException):
+                # Stop at the last good page; its nextLink points at the failed one
+                logger.warning(f"Stopped paging {endpoint} early: {page}")
+                break
+            items.extend(page.get("value", []))
+            next_link = page.get("@odata.nextLink")
+    else:
+        for _ in range(1, pages):
+            try:
+                page = await _get_page(next_link.removeprefix(GRAPH_BASE_URL), cacheable=cacheable)
+            except Exception as e:
+                # Same as the concurrent path: keep the pages fetched so far
+                logger.warning(f"Stopped paging {endpoint} early: {e}")
+                break
+            items.extend(page.get("value", []))
+            next_link = page.get("@odata.nextLink")
+            if not next_link:
+                break
     
-    fields.append(f"📎 Has Attachments: {msg.get('hasAttachments', False)}")
-    fields.append(f"📝 Is Draft: {msg.get('isDraft', False)}")
-    fields.append(f"📖 Is Read: {msg.get('isRead', False)}")
+    return {"value": items, "@odata.nextLink": next_link}
+
+
+async def _upload_large_attachment(message_id: str, file_path: str, file_name: str, size: int) -> None:
+    """Upload a file attachment in chunks through a Graph upload session."""
+    session = await make_graph_request(
+        "POST",
+        f"/me/messages/{message_id}/attachments/createUploadSession",
+        data={"AttachmentItem": {"attachmentType": "file", "name": file_name, "size": size}}
+    )
+    upload_url = session["uploadUrl"]
     
-    body_preview = msg.get('bodyPreview', '')
-    if body_preview:
-        fields.append(f"\n📄 Preview:\n{body_preview[:500]}")
+    # The upload URL is pre-authenticated (it carries its own token), so Graph rejects
+    # an Authorization header on it and it must never appear in errors or logs
+    client = _get_client()
+    try:
+        with open(file_path, "rb") as f:
+            for start in range(0, size, UPLOAD_CHUNK_SIZE):
+                chunk = await asyncio.to_thread(f.read, UPLOAD_CHUNK_SIZE)
+                end = start + len(chunk) - 1
+                try:
+                    response = await client.put(
+                        upload_url,
+                        content=chunk,
+                        headers={
+                            "Content-Range": f"bytes {start}-{end}/{size}",
+                            "Content-Length": str(len(chunk))
+                        },
+                        timeout=60
+                    )
+                except httpx.RequestError as e:
+                    raise Exception(f"Upload chunk {start}-{end} failed: {type(e).__name__}") from None
+                
+                if response.is_error:
+                    raise Exception(f"Upload chunk {start}-{end} failed: {response.status_code} {response.text}")
+    except Exception:
+        # Cancel the upload session so it does not stay open on the server
+        try:
+            await client.delete(upload_url, timeout=30)
+        except httpx.HTTPError as e:
+            logger.warning(f"Could not cancel attachment upload session: {type(e).__name__}")
+        raise
+
+
+def _read_file(file_path: str) -> bytes:
+    """Read a whole file from disk."""
+    with open(file_path, "rb") as f:
+        return f.read()
+
+
+def require(**required: bool):
+    """Decorate a tool so it returns an error unless the named arguments are non-empty."""
+    names = tuple(name for name, needed in required.items() if needed)
     
-    msg_id = msg.get('id', '')
-    if msg_id:
-        fields.append(f"\n🔑 ID: {msg_id}")
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(**kwargs):
+            for name in names:
+                if not kwargs.get(name, "").strip():
+                    return f"❌ Error: {name} is required"
+            return await fn(**kwargs)
+        return wrapper
     
-    return "\n".join(fields)
+    return decorator
 
 
 # === MCP TOOLS ===
@@ -149,10 +498,13 @@ async def read_emails(
     folder_id: str = "",
     filter_str: str = "",
     search: str = "",
-    select_fields: str = "id,subject,from,toRecipients,ccRecipients,receivedDateTime,sentDateTime,importance,hasAttachments,isDraft,isRead,bodyPreview",
+    select_fields: str = DEFAULT_LIST_SELECT,
     order_by: str = "receivedDateTime DESC",
     top: str = "25",
-    skip: str = "0"
+    skip: str = "0",
+    include_attachments: str = "false",
+    max_pages: str = "1",
+    concurrent: str = "false"
 ) -> str:
     """List emails from inbox or specified folder with filtering options."""
     try:
@@ -176,24 +528,66 @@ async def read_emails(
         if select_fields.strip():
             params["$select"] = select_fields
         
-        result = await make_graph_request("GET", endpoint, params=params)
+        # Probe the match count before formatting very large pages on the event loop
+        total = None
+        clamp_note = ""
+        if int(top) > MAX_LIST_TOP:
+            try:
+                probe = await make_graph_request(
+                    "GET",
+                    endpoint,
+                    params={**params, "$count": "true", "$top": "1", "$select": "id"},
+                    extra_headers={"ConsistencyLevel": "eventual"}
+                )
+                total = probe.get("@odata.count")
+            except Exception as e:
+                # The probe must not fail the listing; clamp below as if the count were large
+                logger.warning(f"Count probe failed, listing without a total: {e}")
+            if total is None:
+                params["$top"] = str(MAX_LIST_TOP)
+                clamp_note = f"\n\n⚠️ Match count unavailable; top was limited to {MAX_LIST_TOP}. Use skip or max_pages to paginate."
+            elif total > LARGE_RESULT_THRESHOLD:
+                params["$top"] = str(MAX_LIST_TOP)
+                clamp_note = f"\n\n⚠️ {total} emails match; top was limited to {MAX_LIST_TOP}. Use skip or max_pages to paginate."
+        
+        result = await get_paged(endpoint, params, max_pages, concurrent)
         
         messages = result.get("value", [])
         
         if not messages:
             return "✅ No emails found"
         
-        output = [f"📬 Found {len(messages)} emails:\n"]
+        # Fetch attachment names for all listed messages in one batched round-trip
+        attachment_names = {}
+        if include_attachments.lower() == "true":
+            with_attachments = [
+                msg["id"] for msg in messages
+                if msg.get("id") and msg.get("hasAttachments", True)
+            ]
+            responses = await graph_batch([
+                {"method": "GET", "url": f"/me/messages/{msg_id}/attachments?$select=name,size"}
+                for msg_id in with_attachments
+            ])
+            for msg_id, resp in zip(with_attachments, responses):
+                status = resp.get("status", 0)
+                if status == 200:
+                    att_names = [att.get("name", "N/A") for att in resp.get("body", {}).get("value", [])]
+                    if att_names:
+                        attachment_names[msg_id] = ", ".join(att_names)
+                else:
+                    attachment_names[msg_id] = f"unavailable ({status})"
+        
+        total_info = f" (of {total} total)" if total is not None else ""
+        output = [f"📬 Found {len(messages)} emails{total_info}:\n"]
+        append = output.append
         
         for i, msg in enumerate(messages, 1):
-            output.append(f"\n--- Email {i} ---")
-            output.append(format_email(msg))
-        
-        # Add pagination info
-        if "@odata.nextLink" in result:
-            output.append("\n\n⚠️ More emails available. Use skip parameter to paginate.")
+            append(f"\n--- Email {i} ---\n{format_email(msg)}")
+            names = attachment_names.get(msg.get("id"))
+            if names:
+                append("📎 Attachments: " + names)
         
-        return "\n".join(output)
+        return "\n".join(output) + clamp_note + format_pagination(result)
         
     except Exception as e:
         logger.error(f"Error reading emails: {e}")
@@ -201,15 +595,13 @@ async def read_emails(
 
 
 @mcp.tool()
+@require(message_id=True)
 async def get_email(
     message_id: str = "",
     select_fields: str = "id,subject,from,toRecipients,ccRecipients,bccRecipients,receivedDateTime,sentDateTime,importance,hasAttachments,isDraft,isRead,body,bodyPreview,replyTo,internetMessageHeaders"
 ) -> str:
     """Get a specific email by ID with full details."""
     try:
-        if not message_id.strip():
-            return "❌ Error: message_id is required"
-        
         params = {}
         if select_fields.strip():
             params["$select"] = select_fields
@@ -223,6 +615,41 @@ async def get_email(
         return f"❌ Error: {str(e)}"
 
 
+@mcp.tool()
+async def read_emails_bulk(
+    message_ids: str = "",
+    select_fields: str = DEFAULT_LIST_SELECT
+) -> str:
+    """Get several emails by ID (comma-separated) in a single batched request."""
+    try:
+        ids = [msg_id.strip() for msg_id in message_ids.split(",") if msg_id.strip()]
+        
+        if not ids:
+            return "❌ Error: message_ids is required"
+        
+        query = "?" + urlencode({"$select": select_fields}, safe="$,") if select_fields.strip() else ""
+        responses = await graph_batch([
+            {"method": "GET", "url": f"/me/messages/{msg_id}{query}"}
+            for msg_id in ids
+        ])
+        
+        output = [f"📬 Retrieved {len(ids)} emails:\n"]
+        
+        for i, (msg_id, resp) in enumerate(zip(ids, responses), 1):
+            status = resp.get("status", 0)
+            if status == 200:
+                output.append(f"\n--- Email {i} ---\n{format_email(resp.get('body', {}))}")
+            else:
+                error = resp.get("body", {}).get("error", {}).get("message", "Unknown error")
+                output.append(f"\n--- Email {i} ---\n❌ Error {status} for {msg_id}: {error}")
+        
+        return "\n".join(output)
+        
+    except Exception as e:
+        logger.error(f"Error reading emails in bulk: {e}")
+        return f"❌ Error: {str(e)}"
+
+
 @mcp.tool()
 async def create_draft(
     subject: str = "",
@@ -242,29 +669,17 @@ async def create_draft(
         message = {
             "subject": subject,
             "importance": importance,
-            "body": {
-                "contentType": body_type.lower(),
-                "content": body
-            }
+            "body": message_body(body, body_type)
         }
         
-        if to_recipients.strip():
-            message["toRecipients"] = [
-                {"emailAddress": {"address": addr.strip()}} 
-                for addr in to_recipients.split(",") if addr.strip()
-            ]
+        if (recips := parse_recipients(to_recipients)):
+            message["toRecipients"] = recips
         
-        if cc_recipients.strip():
-            message["ccRecipients"] = [
-                {"emailAddress": {"address": addr.strip()}} 
-                for addr in cc_recipients.split(",") if addr.strip()
-            ]
+        if (recips := parse_recipients(cc_recipients)):
+            message["ccRecipients"] = recips
         
-        if bcc_recipients.strip():
-            message["bccRecipients"] = [
-                {"emailAddress": {"address": addr.strip()}} 
-                for addr in bcc_recipients.split(",") if addr.strip()
-            ]
+        if (recips := parse_recipients(bcc_recipients)):
+            message["bccRecipients"] = recips
         
         result = await make_graph_request("POST", "/me/messages", data=message)
         
@@ -290,8 +705,8 @@ async def send_email(
 ) -> str:
     """Send an email directly."""
     try:
-        if not to_recipients.strip():
-            return "❌ Error: At least one recipient is required"
+        if not (to_list := parse_recipients(to_recipients)):
+            return "❌ Error: to_recipients is required"
         
         if not subject.strip() and not body.strip():
             return "❌ Error: Subject or body is required"
@@ -300,29 +715,15 @@ async def send_email(
             "subject": subject,
             "importance": importance,
             "saveToSentItems": save_to_sent.lower() == "true",
-            "body": {
-                "contentType": body_type.lower(),
-                "content": body
-            }
+            "body": message_body(body, body_type),
+            "toRecipients": to_list
         }
         
-        if to_recipients.strip():
-            message["toRecipients"] = [
-                {"emailAddress": {"address": addr.strip()}} 
-                for addr in to_recipients.split(",") if addr.strip()
-            ]
+        if (recips := parse_recipients(cc_recipients)):
+            message["ccRecipients"] = recips
         
-        if cc_recipients.strip():
-            message["ccRecipients"] = [
-                {"emailAddress": {"address": addr.strip()}} 
-                for addr in cc_recipients.split(",") if addr.strip()
-            ]
-        
-        if bcc_recipients.strip():
-            message["bccRecipients"] = [
-                {"emailAddress": {"address": addr.strip()}} 
-                for addr in bcc_recipients.split(",") if addr.strip()
-            ]
+        if (recips := parse_recipients(bcc_recipients)):
+            message["bccRecipients"] = recips
         
         result = await make_graph_request("POST", "/me/sendMail", data={"message": message})
         
@@ -334,14 +735,12 @@ async def send_email(
 
 
 @mcp.tool()
+@require(message_id=True)
 async def send_draft(
     message_id: str = ""
 ) -> str:
     """Send an existing draft by ID."""
     try:
-        if not message_id.strip():
-            return "❌ Error: message_id is required"
-        
         await make_graph_request("POST", f"/me/messages/{message_id}/send", data={})
         
         return f"✅ Draft sent successfully!\n\n📧 Message ID: {message_id}"
@@ -352,6 +751,7 @@ async def send_draft(
 
 
 @mcp.tool()
+@require(message_id=True)
 async def forward_email(
     message_id: str = "",
     to_recipients: str = "",
@@ -359,18 +759,10 @@ async def forward_email(
 ) -> str:
     """Forward an existing email."""
     try:
-        if not message_id.strip():
-            return "❌ Error: message_id is required"
-        
-        if not to_recipients.strip():
+        if not (recips := parse_recipients(to_recipients)):
             return "❌ Error: to_recipients is required"
         
-        forward_data = {
-            "toRecipients": [
-                {"emailAddress": {"address": addr.strip()}} 
-                for addr in to_recipients.split(",") if addr.strip()
-            ]
-        }
+        forward_data = {"toRecipients": recips}
         
         if comment.strip():
             forward_data["comment"] = comment
@@ -385,6 +777,7 @@ async def forward_email(
 
 
 @mcp.tool()
+@require(message_id=True)
 async def reply_email(
     message_id: str = "",
     body: str = "",
@@ -392,9 +785,6 @@ async def reply_email(
 ) -> str:
     """Reply to an email."""
     try:
-        if not message_id.strip():
-            return "❌ Error: message_id is required"
-        
         endpoint = f"/me/messages/{message_id}/reply"
         
         reply_data = {}
@@ -415,6 +805,7 @@ async def reply_email(
 
 
 @mcp.tool()
+@require(message_id=True)
 async def create_draft_reply(
     message_id: str = "",
     body: str = "",
@@ -422,9 +813,6 @@ async def create_draft_reply(
 ) -> str:
     """Create a draft reply to an email."""
     try:
-        if not message_id.strip():
-            return "❌ Error: message_id is required"
-        
         endpoint = f"/me/messages/{message_id}/createReply"
         
         reply_data = {}
@@ -446,15 +834,13 @@ async def create_draft_reply(
 
 
 @mcp.tool()
+@require(message_id=True)
 async def create_draft_forward(
     message_id: str = "",
     body: str = ""
 ) -> str:
     """Create a draft forward of an email."""
     try:
-        if not message_id.strip():
-            return "❌ Error: message_id is required"
-        
         forward_data = {}
         if body.strip():
             forward_data["message"] = {"body": {"contentType": "text", "content": body}}
@@ -471,14 +857,12 @@ async def create_draft_forward(
 
 
 @mcp.tool()
+@require(message_id=True)
 async def delete_email(
     message_id: str = ""
 ) -> str:
     """Delete an email (moves to deleted items)."""
     try:
-        if not message_id.strip():
-            return "❌ Error: message_id is required"
-        
         await make_graph_request("DELETE", f"/me/messages/{message_id}")
         
         return f"✅ Email deleted successfully!\n\n📧 Message ID: {message_id}"
@@ -489,14 +873,12 @@ async def delete_email(
 
 
 @mcp.tool()
+@require(message_id=True)
 async def permanent_delete_email(
     message_id: str = ""
 ) -> str:
     """Permanently delete an email."""
     try:
-        if not message_id.strip():
-            return "❌ Error: message_id is required"
-        
         await make_graph_request("DELETE", f"/me/messages/{message_id}/permanentDelete")
         
         return f"✅ Email permanently deleted!\n\n📧 Message ID: {message_id}"
@@ -507,18 +889,13 @@ async def permanent_delete_email(
 
 
 @mcp.tool()
+@require(message_id=True, destination_folder_id=True)
 async def move_email(
     message_id: str = "",
     destination_folder_id: str = ""
 ) -> str:
     """Move an email to a different folder."""
     try:
-        if not message_id.strip():
-            return "❌ Error: message_id is required"
-        
-        if not destination_folder_id.strip():
-            return "❌ Error: destination_folder_id is required"
-        
         move_data = {
             "destinationId": destination_folder_id
         }
@@ -535,18 +912,13 @@ async def move_email(
 
 
 @mcp.tool()
+@require(message_id=True, destination_folder_id=True)
 async def copy_email(
     message_id: str = "",
     destination_folder_id: str = ""
 ) -> str:
     """Copy an email to a different folder."""
     try:
-        if not message_id.strip():
-            return "❌ Error: message_id is required"
-        
-        if not destination_folder_id.strip():
-            return "❌ Error: destination_folder_id is required"
-        
         copy_data = {
             "destinationId": destination_folder_id
         }
@@ -563,6 +935,7 @@ async def copy_email(
 
 
 @mcp.tool()
+@require(message_id=True)
 async def update_email(
     message_id: str = "",
     is_read: str = "",
@@ -572,9 +945,6 @@ async def update_email(
 ) -> str:
     """Update email properties (read status, importance, subject, etc.)."""
     try:
-        if not message_id.strip():
-            return "❌ Error: message_id is required"
-        
         update_data = {}
         
         if is_read.strip():
@@ -594,7 +964,7 @@ async def update_email(
         
         result = await make_graph_request("PATCH", f"/me/messages/{message_id}", data=update_data)
         
-        return f"✅ Email updated successfully!\n\n📧 Message ID: {message_id}\n📝 Updates: {json.dumps(update_data, indent=2)}"
+        return f"✅ Email updated successfully!\n\n📧 Message ID: {message_id}\n📝 Updates: {orjson.dumps(update_data, option=orjson.OPT_INDENT_2).decode()}"
         
     except Exception as e:
         logger.error(f"Error updating email: {e}")
@@ -602,10 +972,13 @@ async def update_email(
 
 
 @mcp.tool()
-async def list_folders() -> str:
+async def list_folders(
+    max_pages: str = "1",
+    concurrent: str = "false"
+) -> str:
     """List all email folders in the mailbox."""
     try:
-        result = await make_graph_request("GET", "/me/mailFolders")
+        result = await get_paged("/me/mailFolders", max_pages=max_pages, concurrent=concurrent, cacheable=True)
         
         folders = result.get("value", [])
         
@@ -615,12 +988,15 @@ async def list_folders() -> str:
         output = [f"📁 Found {len(folders)} folders:\n"]
         
         for folder in folders:
-            output.append(f"\n📁 {folder.get('displayName', 'N/A')}")
-            output.append(f"   ID: {folder.get('id', 'N/A')}")
-            output.append(f"   Total Items: {folder.get('totalItemCount', 0)}")
-            output.append(f"   Unread: {folder.get('unreadItemCount', 0)}")
+            get = folder.get
+            output.append(
+                f"\n📁 {get('displayName', 'N/A')}\n"
+                f"   ID: {get('id', 'N/A')}\n"
+                f"   Total Items: {get('totalItemCount', 0)}\n"
+                f"   Unread: {get('unreadItemCount', 0)}"
+            )
         
-        return "\n".join(output)
+        return "\n".join(output) + format_pagination(result)
         
     except Exception as e:
         logger.error(f"Error listing folders: {e}")
@@ -628,15 +1004,15 @@ async def list_folders() -> str:
 
 
 @mcp.tool()
+@require(message_id=True)
 async def list_attachments(
-    message_id: str = ""
+    message_id: str = "",
+    max_pages: str = "1",
+    concurrent: str = "false"
 ) -> str:
     """List all attachments for an email."""
     try:
-        if not message_id.strip():
-            return "❌ Error: message_id is required"
-        
-        result = await make_graph_request("GET", f"/me/messages/{message_id}/attachments")
+        result = await get_paged(f"/me/messages/{message_id}/attachments", max_pages=max_pages, concurrent=concurrent)
         
         attachments = result.get("value", [])
         
@@ -650,11 +1026,9 @@ async def list_attachments(
             name = att.get("name", "N/A")
             size = att.get("size", 0)
             
-            output.append(f"\n📎 {name}")
-            output.append(f"   Type: {att_type}")
-            output.append(f"   Size: {size} bytes")
+            output.append(f"\n📎 {name}\n   Type: {att_type}\n   Size: {size} bytes")
         
-        return "\n".join(output)
+        return "\n".join(output) + format_pagination(result)
         
     except Exception as e:
         logger.error(f"Error listing attachments: {e}")
@@ -662,23 +1036,37 @@ async def list_attachments(
 
 
 @mcp.tool()
+@require(message_id=True)
 async def add_attachment(
     message_id: str = "",
     file_name: str = "",
-    content_bytes: str = ""
+    content_bytes: str = "",
+    file_path: str = ""
 ) -> str:
-    """Add an attachment to an email draft."""
+    """Add an attachment to an email draft from a local file path or base64 content."""
     try:
-        if not message_id.strip():
-            return "❌ Error: message_id is required"
+        if file_path.strip():
+            if not os.path.isfile(file_path):
+                return f"❌ Error: File not found: {file_path}"
+            
+            file_name = file_name.strip() or os.path.basename(file_path)
+            size = os.path.getsize(file_path)
+            
+            if size == 0:
+                return f"❌ Error: File is empty: {file_path}"
+            
+            if size > ATTACHMENT_UPLOAD_THRESHOLD:
+                await _upload_large_attachment(message_id, file_path, file_name, size)
+                return f"✅ Attachment uploaded!\n\n📄 File name: {file_name}\n📦 Size: {size} bytes"
+            
+            raw = await asyncio.to_thread(_read_file, file_path)
+            content_bytes = base64.b64encode(raw).decode("ascii")
         
         if not file_name.strip():
             return "❌ Error: file_name is required"
         
         if not content_bytes.strip():
-            return "❌ Error: content_bytes is required"
-        
-        import base64
+            return "❌ Error: content_bytes or file_path is required"
         
         attachment_data = {
             "@odata.type": "#microsoft.graph.fileAttachment",
@@ -708,14 +1096,14 @@ async def get_mail_folders(
             "$select": "id,displayName,totalItemCount,unreadItemCount,childFolderCount"
         }
         
-        result = await make_graph_request("GET", "/me/mailFolders", params=params)
+        result = await make_graph_request("GET", "/me/mailFolders", params=params, cacheable=True)
         
         folders = result.get("value", [])
         
         if not folders:
             return "✅ No folders found"
         
-        output = [f"📁 Mail Folders:\n"]
+        output = ["📁 Mail Folders:\n"]
         
         for folder in folders:
             name = folder.get("displayName", "N/A")
@@ -723,8 +1111,7 @@ async def get_mail_folders(
             unread = folder.get("unreadItemCount", 0)
             children = folder.get("childFolderCount", 0)
             
-            output.append(f"\n📁 {name}")
-            output.append(f"   Total: {total} | Unread: {unread} | Subfolders: {children}")
+            output.append(f"\n📁 {name}\n   Total: {total} | Unread: {unread} | Subfolders: {children}")
         
         return "\n".join(output)
         
@@ -737,7 +1124,9 @@ async def get_mail_folders(
 async def search_emails(
     query: str = "",
     filter_str: str = "",
-    top: str = "25"
+    top: str = "25",
+    max_pages: str = "1",
+    concurrent: str = "false"
 ) -> str:
     """Search emails using Microsoft Search or OData filters."""
     try:
@@ -746,7 +1135,7 @@ async def search_emails(
         
         params = {
             "$top": top,
-            "$select": "id,subject,from,toRecipients,receivedDateTime,importance,hasAttachments,isRead"
+            "$select": "id,subject,from,receivedDateTime,isRead"
         }
         
         if query.strip():
@@ -755,7 +1144,7 @@ async def search_emails(
         if filter_str.strip():
             params["$filter"] = filter_str
         
-        result = await make_graph_request("GET", "/me/messages", params=params)
+        result = await get_paged("/me/messages", params, max_pages, concurrent)
         
         messages = result.get("value", [])
         
@@ -771,11 +1160,9 @@ async def search_emails(
             is_read = msg.get("isRead", False)
             
             read_status = "📖" if is_read else "📕"
-            output.append(f"\n{read_status} {subject}")
-            output.append(f"   From: {from_addr}")
-            output.append(f"   Received: {received}")
+            output.append(f"\n{read_status} {subject}\n   From: {from_addr}\n   Received: {received}")
         
-        return "\n".join(output)
+        return "\n".join(output) + format_pagination(result)
         
     except Exception as e:
         logger.error(f"Error searching emails: {e}")
@@ -784,7 +1171,9 @@ async def search_emails(
 
 @mcp.tool()
 async def get_unread_emails(
-    top: str = "25"
+    top: str = "25",
+    max_pages: str = "1",
+    concurrent: str = "false"
 ) -> str:
     """Get all unread emails from inbox."""
     try:
@@ -792,10 +1181,10 @@ async def get_unread_emails(
             "$filter": "isRead eq false",
             "$top": top,
             "$orderby": "receivedDateTime DESC",
-            "$select": "id,subject,from,toRecipients,receivedDateTime,importance,hasAttachments"
+            "$select": DEFAULT_LIST_SELECT
         }
         
-        result = await make_graph_request("GET", "/me/messages", params=params)
+        result = await get_paged("/me/messages", params, max_pages, concurrent)
         
         messages = result.get("value", [])
         
@@ -805,10 +1194,9 @@ async def get_unread_emails(
         output = [f"📕 Found {len(messages)} unread emails:\n"]
         
         for msg in messages:
-            output.append(f"\n--- Unread Email ---")
-            output.append(format_email(msg))
+            output.append("\n--- Unread Email ---\n" + format_email(msg))
         
-        return "\n".join(output)
+        return "\n".join(output) + format_pagination(result)
         
     except Exception as e:
         logger.error(f"Error getting unread emails: {e}")
@@ -817,7 +1205,9 @@ async def get_unread_emails(
 
 @mcp.tool()
 async def get_draft_emails(
-    top: str = "25"
+    top: str = "25",
+    max_pages: str = "1",
+    concurrent: str = "false"
 ) -> str:
     """Get all draft emails."""
     try:
@@ -825,10 +1215,10 @@ async def get_draft_emails(
             "$filter": "isDraft eq true",
             "$top": top,
             "$orderby": "createdDateTime DESC",
-            "$select": "id,subject,toRecipients,ccRecipients,createdDateTime"
+            "$select": "id,subject,toRecipients,createdDateTime"
         }
         
-        result = await make_graph_request("GET", "/me/messages", params=params)
+        result = await get_paged("/me/messages", params, max_pages, concurrent)
         
         messages = result.get("value", [])
         
@@ -842,15 +1232,11 @@ async def get_draft_emails(
             created = msg.get("createdDateTime", "N/A")
             msg_id = msg.get("id", "N/A")
             
-            to_recipients = msg.get("toRecipients", [])
-            to_list = ", ".join([r.get("emailAddress", {}).get("address", "") for r in to_recipients])
+            to_list = join_addresses(msg.get("toRecipients", []))
             
-            output.append(f"\n📝 Draft: {subject}")
-            output.append(f"   To: {to_list or 'N/A'}")
-            output.append(f"   Created: {created}")
-            output.append(f"   ID: {msg_id}")
+            output.append(f"\n📝 Draft: {subject}\n   To: {to_list or 'N/A'}\n   Created: {created}\n   ID: {msg_id}")
         
-        return "\n".join(output)
+        return "\n".join(output) + format_pagination(result)
         
     except Exception as e:
         logger.error(f"Error getting draft emails: {e}")
@@ -858,14 +1244,12 @@ async def get_draft_emails(
 
 
 @mcp.tool()
+@require(message_id=True)
 async def mark_as_read(
     message_id: str = ""
 ) -> str:
     """Mark an email as read."""
     try:
-        if not message_id.strip():
-            return "❌ Error: message_id is required"
-        
         update_data = {"isRead": True}
         await make_graph_request("PATCH", f"/me/messages/{message_id}", data=update_data)
         
@@ -877,14 +1261,12 @@ async def mark_as_read(
 
 
 @mcp.tool()
+@require(message_id=True)
 async def mark_as_unread(
     message_id: str = ""
 ) -> str:
     """Mark an email as unread."""
     try:
-        if not message_id.strip():
-            return "❌ Error: message_id is required"
-        
         update_data = {"isRead": False}
         await make_graph_request("PATCH", f"/me/messages/{message_id}", data=update_data)
         